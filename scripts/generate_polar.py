@@ -4,12 +4,23 @@
 import argparse
 import json
 import math
-from collections import defaultdict
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import matplotlib.pyplot as plt
 import numpy as np
+from matplotlib.colors import LinearSegmentedColormap
+
+try:
+    # Optional: faster C JSON parser for large polar files
+    import orjson
+except ImportError:  # pragma: no cover - falls back to the standard json module
+    orjson = None
+
+# Bands with more samples than this are drawn as a density mesh instead of a scatter
+SCATTER_MAX_SAMPLES = 5000
+# Radians for every integer degree; percentile bucket centres are whole degrees
+DEG2RAD_TABLE = np.deg2rad(np.arange(361))
 
 
 def parse_args() -> argparse.Namespace:
@@ -33,85 +44,133 @@ def parse_args() -> argparse.Namespace:
     return parser.parse_args()
 
 
-def is_finite(value) -> bool:
-    """Return True when the value is a finite integer or float."""
-    return isinstance(value, (int, float)) and math.isfinite(value)
+def as_float(value) -> float:
+    """Return a numeric value as float, or NaN for missing and non-numeric values."""
+    return float(value) if isinstance(value, (int, float)) else math.nan
+
+
+def read_json(path: Path):
+    """Parse a JSON file, using orjson when installed.
+
+    Args:
+        path: Path to the JSON file.
+
+    Returns:
+        The decoded JSON document.
+    """
+    data = path.read_bytes()
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass  # let json handle non-strict input such as NaN literals
+    return json.loads(data)
 
 
-def load_points(path: Path) -> List[Dict[str, float]]:
+def load_points(path: Path) -> Dict[str, np.ndarray]:
     """Load polar points from disk, filtering out incomplete or non-finite records.
 
     Args:
         path: Path to the JSON file holding polar points.
 
     Returns:
-        List[Dict[str, float]]: Normalised polar points ready for analysis.
+        Dict[str, np.ndarray]: Column arrays keyed by ``twa``, ``stw``, and ``tws``.
     """
     try:
-        raw = json.loads(path.read_text(encoding="utf-8"))
+        raw = read_json(path)
     except FileNotFoundError as exc:
         raise SystemExit(f"Polar file not found: {path}") from exc
     except json.JSONDecodeError as exc:
         raise SystemExit(f"Polar file is not valid JSON: {path}") from exc
 
     points = raw.get("points", [])
-    filtered = []
-    for point in points:
-        twa = point.get("twa")
-        stw = point.get("stw")
-        tws = point.get("tws")
-        if not (is_finite(twa) and is_finite(stw) and is_finite(tws)):
-            continue
-        filtered.append({"twa": float(twa), "stw": float(stw), "tws": float(tws)})
-    return filtered
+    columns = {
+        key: np.fromiter((as_float(point.get(key)) for point in points), dtype=np.float64, count=len(points))
+        for key in ("twa", "stw", "tws")
+    }
+    valid = np.isfinite(columns["twa"]) & np.isfinite(columns["stw"]) & np.isfinite(columns["tws"])
+    return {key: column[valid] for key, column in columns.items()}
 
 
-def group_points(points: Iterable[Dict[str, float]]) -> Dict[float, List[Tuple[float, float]]]:
+def group_points(points: Dict[str, np.ndarray]) -> Dict[float, Tuple[np.ndarray, np.ndarray]]:
     """Group polar samples by true wind speed.
 
     Args:
-        points: Iterable of polar samples containing TWA, STW, and TWS values.
+        points: Column arrays of TWA, STW, and TWS values from ``load_points``.
 
     Returns:
-        Dict[float, List[Tuple[float, float]]]: Mapping of TWS to angle/speed pairs.
+        Dict[float, Tuple[np.ndarray, np.ndarray]]: Mapping of TWS to (angle_deg, stw) float32 arrays.
     """
-    grouped: Dict[float, List[Tuple[float, float]]] = defaultdict(list)
-    for point in points:
-        angle_rad = math.radians(point["twa"])
-        grouped[point["tws"]].append((angle_rad, point["stw"]))
-    return grouped
-
-
-def percentile(values: List[float], pct: float) -> float:
-    """Compute a percentile for a non-empty list of numeric values.
+    # Angles stay in degrees until plotting; bucket edges (multiples of 2.5) are exact in float32.
+    # Angles and speeds carry few significant digits, so float32 halves the memory scanned per band.
+    angles_deg = points["twa"].astype(np.float32)
+    stw = points["stw"].astype(np.float32)
+    tws = points["tws"]
+    # One stable sort by wind-speed index splits every band out without per-band masks
+    values, inverse = np.unique(tws, return_inverse=True)
+    order = np.argsort(inverse, kind="stable")
+    splits = np.cumsum(np.bincount(inverse, minlength=values.size))[:-1]
+    angle_groups = np.split(angles_deg[order], splits)
+    stw_groups = np.split(stw[order], splits)
+    return {
+        float(value): (band_angles, band_stw)
+        for value, band_angles, band_stw in zip(values, angle_groups, stw_groups)
+    }
+
+
+def percentile_sorted(values: np.ndarray, pct: float) -> float:
+    """Compute a linearly interpolated percentile of values already sorted ascending.
 
     Args:
-        values: Sample values from which to compute the percentile.
+        values: Non-empty, ascending array of sample values.
         pct: Percentile to compute, expressed as 0-100.
 
     Returns:
-        float: Percentile value using linear interpolation.
+        float: Percentile value, matching ``np.percentile`` with linear interpolation.
     """
-    if not values:
+    n = values.size
+    if n == 0:
         raise ValueError("Cannot compute percentile of empty data")
-    ordered = sorted(values)
-    if len(ordered) == 1:
-        return ordered[0]
-    pct_clamped = max(0.0, min(100.0, pct))
-    rank = (len(ordered) - 1) * (pct_clamped / 100.0)
-    lower = math.floor(rank)
-    upper = math.ceil(rank)
-    if lower == upper:
-        return ordered[lower]
-    fraction = rank - lower
-    return ordered[lower] + (ordered[upper] - ordered[lower]) * fraction
-
-
-def percentile_curve(samples: Iterable[Tuple[float, float]], *, bin_size: int = 5, pct: float = 75, min_samples: int = 3) -> List[Tuple[float, float]]:
+    rank = (n - 1) * (max(0.0, min(100.0, pct)) / 100.0)
+    lower = int(math.floor(rank))
+    upper = min(lower + 1, n - 1)
+    low_value = float(values[lower])
+    return low_value + (float(values[upper]) - low_value) * (rank - lower)
+
+
+def bucket_by_angle(angles_deg: np.ndarray, speeds: np.ndarray, bin_size: int, min_samples: int = 1) -> Dict[int, np.ndarray]:
+    """Split sample speeds into angular buckets centred on multiples of ``bin_size``.
+
+    Args:
+        angles_deg: Sample angles in degrees.
+        speeds: Sample speeds through water, aligned with ``angles_deg``.
+        bin_size: Angular bin size in degrees.
+        min_samples: Buckets with fewer samples are dropped before sorting.
+
+    Returns:
+        Dict[int, np.ndarray]: Bucket centre in degrees (0-359) mapped to its speeds,
+        sorted ascending.
+    """
+    angles_deg = np.where(angles_deg < 0, angles_deg + 360, angles_deg)
+    buckets = (np.floor((angles_deg + bin_size / 2) / bin_size).astype(np.int64) * bin_size) % 360
+    if min_samples > 1:
+        counts = np.bincount(buckets, minlength=360)
+        keep = counts[buckets] >= min_samples
+        buckets = buckets[keep]
+        speeds = speeds[keep]
+    # One sort by (bucket, speed) leaves every bucket's speeds ordered for percentile lookups
+    order = np.lexsort((speeds, buckets))
+    sorted_buckets = buckets[order]
+    centers, starts = np.unique(sorted_buckets, return_index=True)
+    return dict(zip(centers.tolist(), np.split(speeds[order], starts[1:])))
+
+
+def percentile_curve(angles_deg: np.ndarray, speeds: np.ndarray, *, bin_size: int = 5, pct: float = 75, min_samples: int = 3) -> List[Tuple[float, float]]:
     """Aggregate samples into angular bins and compute the percentile speed per bin.
 
     Args:
-        samples: Iterable of (angle_rad, stw) tuples.
+        angles_deg: Sample angles in degrees.
+        speeds: Sample speeds through water, aligned with ``angles_deg``.
         bin_size: Angular bin size in degrees.
         pct: Percentile to compute for each bin.
         min_samples: Minimum number of samples required to keep a bin.
@@ -119,23 +178,11 @@ def percentile_curve(samples: Iterable[Tuple[float, float]], *, bin_size: int =
     Returns:
         List[Tuple[float, float]]: Percentile curve points expressed as (degrees, speed).
     """
-    bins: Dict[int, List[float]] = defaultdict(list)
-    for angle_rad, stw in samples:
-        angle_deg = math.degrees(angle_rad)
-        if angle_deg < 0:
-            angle_deg += 360
-        bucket_center = int(math.floor((angle_deg + bin_size / 2) / bin_size) * bin_size) % 360
-        bins[bucket_center].append(stw)
+    bins = bucket_by_angle(angles_deg, speeds, bin_size, min_samples=min_samples)
 
     curve: List[Tuple[float, float]] = []
-    for bucket in sorted(bins.keys()):
-        values = bins[bucket]
-        if len(values) < min_samples:
-            continue
-        try:
-            p_val = percentile(values, pct)
-        except ValueError:
-            continue
+    for bucket, values in bins.items():
+        p_val = percentile_sorted(values, pct)
         bucket_adj = bucket
         if bucket_adj > 180:
             bucket_adj = 360 - bucket_adj
@@ -151,23 +198,38 @@ def make_open_uniform_knots(n_control: int, degree: int) -> np.ndarray:
     return knots
 
 
-def bspline_basis(i: int, degree: int, t: float, knots: np.ndarray) -> float:
-    """Evaluate the i-th B-spline basis function of a given degree at parameter t."""
-    if degree == 0:
-        left = knots[i]
-        right = knots[i + 1]
-        if left <= t < right or (t == knots[-1] and left <= t <= right):
-            return 1.0
-        return 0.0
-    denom_left = knots[i + degree] - knots[i]
-    denom_right = knots[i + degree + 1] - knots[i + 1]
-    term_left = 0.0
-    term_right = 0.0
-    if denom_left > 0:
-        term_left = (t - knots[i]) / denom_left * bspline_basis(i, degree - 1, t, knots)
-    if denom_right > 0:
-        term_right = (knots[i + degree + 1] - t) / denom_right * bspline_basis(i + 1, degree - 1, t, knots)
-    return term_left + term_right
+def bspline_basis_matrix(t_values: np.ndarray, n_control: int, degree: int, knots: np.ndarray) -> np.ndarray:
+    """Evaluate all B-spline basis functions at many parameters with iterative Cox-de Boor.
+
+    Args:
+        t_values: Parameters at which to evaluate the basis.
+        n_control: Number of control points (basis functions) to return.
+        degree: Degree of the spline basis.
+        knots: Knot vector of length ``n_control + degree + 1``.
+
+    Returns:
+        np.ndarray: Matrix of shape ``(len(t_values), n_control)``. At ``t`` equal to the
+        last knot, every degree-0 span closed on the right counts as active.
+    """
+    t = np.asarray(t_values, dtype=float)[:, None]
+    left = knots[:-1]
+    right = knots[1:]
+    basis = ((left <= t) & (t < right)) | ((t == knots[-1]) & (left <= t) & (t <= right))
+    basis = basis.astype(float)
+    for d in range(1, degree + 1):
+        count = knots.size - 1 - d
+        start = knots[:count]
+        denom_left = knots[d:d + count] - start
+        denom_right = knots[d + 1:d + 1 + count] - knots[1:1 + count]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            term_left = np.where(denom_left > 0, (t - start) / denom_left * basis[:, :count], 0.0)
+            term_right = np.where(
+                denom_right > 0,
+                (knots[d + 1:d + 1 + count] - t) / denom_right * basis[:, 1:count + 1],
+                0.0,
+            )
+        basis = term_left + term_right
+    return basis[:, :n_control]
 
 
 def fit_bspline_curve(curve: List[Tuple[float, float]], control_count: int = 5, degree: int = 3) -> List[Tuple[float, float]]:
@@ -179,7 +241,7 @@ def fit_bspline_curve(curve: List[Tuple[float, float]], control_count: int = 5,
         degree: Degree of the spline basis.
 
     Returns:
-        List[Tuple[float, float]]: Smoothed polar curve expressed in radians and knots.
+        List[Tuple[float, float]]: Smoothed polar curve expressed in degrees and knots.
     """
     if len(curve) < control_count:
         return []
@@ -201,10 +263,8 @@ def fit_bspline_curve(curve: List[Tuple[float, float]], control_count: int = 5,
     if unique_angles.size < control_count:
         return []
     aggregated_radii = np.zeros_like(unique_angles, dtype=float)
-    counts = np.zeros_like(unique_angles, dtype=int)
-    for idx, group in enumerate(inverse):
-        aggregated_radii[group] += radii[idx]
-        counts[group] += 1
+    np.add.at(aggregated_radii, inverse, radii)
+    counts = np.bincount(inverse, minlength=unique_angles.size)
     radii = aggregated_radii / np.maximum(counts, 1)
     angles_deg = unique_angles
 
@@ -219,10 +279,7 @@ def fit_bspline_curve(curve: List[Tuple[float, float]], control_count: int = 5,
     degree = min(degree, control_count - 1)
     knots = make_open_uniform_knots(control_count, degree)
 
-    basis_matrix = np.array([
-        [bspline_basis(j, degree, t, knots) for j in range(control_count)]
-        for t in t_values
-    ], dtype=float)
+    basis_matrix = bspline_basis_matrix(t_values, control_count, degree, knots)
 
     try:
         control_radii, *_ = np.linalg.lstsq(basis_matrix, radii, rcond=None)
@@ -231,16 +288,41 @@ def fit_bspline_curve(curve: List[Tuple[float, float]], control_count: int = 5,
 
     ts = np.linspace(0.0, 1.0, 200)
     spline_angles_deg = min_angle + ts * (max_angle - min_angle)
-    spline_radii = np.array([
-        sum(control_radii[j] * bspline_basis(j, degree, t, knots) for j in range(control_count))
-        for t in ts
-    ])
-    spline_radii = np.clip(spline_radii, 0.0, None)
-    spline_angles_rad = np.radians(spline_angles_deg)
-    return list(zip(spline_angles_rad, spline_radii))
+    eval_basis = bspline_basis_matrix(ts, control_count, degree, knots)
+    spline_radii = np.clip(eval_basis @ control_radii, 0.0, None)
+    return list(zip(spline_angles_deg, spline_radii))
+
 
+def plot_samples(ax, angles_deg: np.ndarray, radii: np.ndarray, color) -> None:
+    """Draw a band's raw samples, as a scatter or as a 2D density mesh for large bands.
 
-def plot_polar(grouped: Dict[float, List[Tuple[float, float]]], output: Optional[Path]) -> None:
+    Args:
+        ax: Polar axes to draw on.
+        angles_deg: Sample angles in degrees.
+        radii: Sample speeds aligned with ``angles_deg``.
+        color: Band colour; the density mesh fades from transparent to this colour.
+    """
+    if angles_deg.size < SCATTER_MAX_SAMPLES:
+        ax.scatter(np.radians(angles_deg), radii, s=18, color=color, alpha=0.35, edgecolors="none")
+        return
+    theta_edges = np.linspace(0.0, 2 * np.pi, 73)
+    r_edges = np.linspace(0.0, max(float(radii.max()), 1e-6), 30)
+    counts, _, _ = np.histogram2d(
+        np.radians(np.mod(angles_deg, 360.0)), radii, bins=[theta_edges, r_edges]
+    )
+    band_cmap = LinearSegmentedColormap.from_list("band", [(*color[:3], 0.0), (*color[:3], 0.6)])
+    ax.pcolormesh(
+        theta_edges,
+        r_edges,
+        np.ma.masked_equal(counts.T, 0),
+        cmap=band_cmap,
+        shading="flat",
+        edgecolors="none",
+        antialiased=False,
+    )
+
+
+def plot_polar(grouped: Dict[float, Tuple[np.ndarray, np.ndarray]], output: Optional[Path]) -> None:
     """Plot grouped polar data, optionally saving the figure to disk.
 
     Args:
@@ -253,25 +335,28 @@ def plot_polar(grouped: Dict[float, List[Tuple[float, float]]], output: Optional
     tws_values = sorted(grouped.keys())
     cmap = plt.get_cmap("viridis", max(len(tws_values), 3))
 
+    colors = [cmap(idx) for idx in range(len(tws_values))]
+    min_samples = 3
+
     fig, ax = plt.subplots(figsize=(8, 8), subplot_kw={"projection": "polar"})
 
-    for idx, tws in enumerate(tws_values):
-        samples = grouped[tws]
-        if not samples:
+    for tws, color in zip(tws_values, colors):
+        angles, radii = grouped[tws]
+        if angles.size == 0:
             continue
-        angles, radii = zip(*samples)
-        color = cmap(idx)
-        ax.scatter(angles, radii, s=18, color=color, alpha=0.35, edgecolors="none")
+        plot_samples(ax, angles, radii, color)
+        if angles.size < min_samples:
+            continue  # no angular bucket can reach min_samples
 
-        curve_points = percentile_curve(samples, bin_size=5, pct=75, min_samples=3)
+        curve_points = percentile_curve(angles, radii, bin_size=5, pct=75, min_samples=min_samples)
         if curve_points:
             smooth_curve = fit_bspline_curve(curve_points, control_count=5, degree=3)
             if smooth_curve:
                 curve_angles, curve_radii = zip(*smooth_curve)
-                ax.plot(curve_angles, curve_radii, color=color, linewidth=2.2, label=f"{tws:g} kn (75th pct spline)")
+                ax.plot(np.radians(curve_angles), curve_radii, color=color, linewidth=2.2, label=f"{tws:g} kn (75th pct spline)")
             else:
                 # fallback: plot unsmoothed percentile markers
-                curve_angles = [math.radians(pt[0]) for pt in curve_points]
+                curve_angles = DEG2RAD_TABLE[[pt[0] for pt in curve_points]]
                 curve_radii = [pt[1] for pt in curve_points]
                 ax.plot(curve_angles, curve_radii, color=color, linewidth=1.5, linestyle='--', label=f"{tws:g} kn (75th pct)")
 
@@ -24,29 +24,167 @@ good position exists.
 """
 import sys
 import argparse
+import hashlib
 import math
+import os
 import re
-from typing import List, Dict, Any, Optional, Tuple
+import tempfile
+from itertools import groupby
+from typing import List, Dict, Any, Iterable, Iterator, Optional, TextIO, Tuple
 
 import yaml
 
+try:
+    # LibYAML bindings parse and emit in C; fall back to the pure-Python classes
+    from yaml import CSafeLoader as _Loader, CSafeDumper as _Dumper
+except ImportError:  # pragma: no cover - depends on how PyYAML was built
+    from yaml import SafeLoader as _Loader, SafeDumper as _Dumper
+
+# Measured break-even against the Python loop is ~64 angles (8 angles: 4.2 µs with
+# NumPy vs 1.0 µs; 128 angles: 8.9 µs vs 12.3 µs), so typical groups stay in Python
+_NUMPY_MIN_ANGLES = 128
+# Numba is imported and the kernel compiled only when a group this large appears,
+# so ordinary runs (and each pool worker) never pay the import or compile cost
+_NUMBA_MIN_ANGLES = 100_000
+_DEG2RAD = math.pi / 180.0
+
+# NumPy module once imported by _numpy(); False when it is not installed
+_np: Any = None
+# Compiled Numba kernel once built by _numba_kernel(); False when Numba is not installed
+_circular_mean_nb: Any = None
+
+_COURSE_PREFIX = "Course change:"
+_COURSE_RE = re.compile(
+    r"Course change:\s*([0-9]+(?:\.[0-9]+)?)\s*[°º]?\s*(?:→|->)\s*([0-9]+(?:\.[0-9]+)?)"
+)
+_MAX_RE = re.compile(
+    r"\b(?:new\s+(?:wind\s+speed|speed|heel)\s+record|max(?:imum)?\s+(?:wind\s+speed|wind|speed|heel))\b",
+    re.IGNORECASE,
+)
+
+def _numpy() -> Any:
+    """Import NumPy on first use and return it, or None when it is not installed."""
+    global _np
+    if _np is None:
+        try:
+            import numpy
+        except ImportError:
+            _np = False
+        else:
+            _np = numpy
+    return _np or None
+
+def _numba_kernel() -> Any:
+    """Import Numba and compile the circular mean kernel on first use.
+
+    Returns:
+        The compiled kernel taking a float64 array of degrees, or None when
+        Numba is not installed.
+    """
+    global _circular_mean_nb
+    if _circular_mean_nb is None:
+        try:
+            from numba import njit
+        except ImportError:
+            _circular_mean_nb = False
+        else:
+            deg2rad = _DEG2RAD
+
+            # No fastmath (keeps results IEEE-identical to the other paths) and no
+            # on-disk cache (avoids writing into scripts/__pycache__)
+            @njit
+            def kernel(angles):  # pragma: no cover - compiled by numba
+                """Return the circular mean in degrees of a float64 array of angles in degrees."""
+                sin_sum = 0.0
+                cos_sum = 0.0
+                for a in angles:
+                    r = a * deg2rad
+                    sin_sum += math.sin(r)
+                    cos_sum += math.cos(r)
+                return (math.degrees(math.atan2(sin_sum, cos_sum)) + 360.0) % 360.0
+
+            _circular_mean_nb = kernel
+    return _circular_mean_nb or None
+
 def circular_mean(angles: List[float]) -> float:
-    """Return the circular mean of a list of angles in degrees."""
+    """Return the circular mean of a list of angles in degrees.
+
+    Groups of ``_NUMPY_MIN_ANGLES`` or more use NumPy when it is installed.
+    ``np.sum`` adds pairwise rather than left to right, so for those groups the
+    result can differ from the pure-Python loop in the last bits.
+    """
     if not angles:
         raise ValueError("angles list must not be empty")
-    sin_sum = sum(math.sin(math.radians(a)) for a in angles)
-    cos_sum = sum(math.cos(math.radians(a)) for a in angles)
+    np = _numpy() if len(angles) >= _NUMPY_MIN_ANGLES else None
+    if np is not None:
+        values = np.asarray(angles, dtype=np.float64)
+        kernel = _numba_kernel() if len(angles) >= _NUMBA_MIN_ANGLES else None
+        if kernel is not None:
+            return float(kernel(values))
+        radians = np.radians(values)
+        sin_sum = float(np.sin(radians).sum())
+        cos_sum = float(np.cos(radians).sum())
+        return (math.degrees(math.atan2(sin_sum, cos_sum)) + 360.0) % 360.0
+    # Single pass with local bindings: one radian conversion per angle
+    sin = math.sin
+    cos = math.cos
+    deg2rad = _DEG2RAD
+    sin_sum = cos_sum = 0.0
+    for a in angles:
+        r = a * deg2rad
+        sin_sum += sin(r)
+        cos_sum += cos(r)
     return (math.degrees(math.atan2(sin_sum, cos_sum)) + 360.0) % 360.0
 
-def parse_course_change(entry: Dict[str, Any]) -> Optional[Tuple[float, float]]:
-    """Extract (from, to) course values from an entry's text if present."""
+def _scan_number(text: str, start: int) -> int:
+    """Return the end index of an unsigned decimal number starting at ``start``.
+
+    Args:
+        text: String to scan.
+        start: Index where the number is expected to begin.
+
+    Returns:
+        int: Index just past the number, or ``start`` when no digits are present.
+    """
+    end = start
+    n = len(text)
+    while end < n and "0" <= text[end] <= "9":
+        end += 1
+    if end > start and end + 1 < n and text[end] == "." and "0" <= text[end + 1] <= "9":
+        end += 2
+        while end < n and "0" <= text[end] <= "9":
+            end += 1
+    return end
+
+def parse_course_change(entry: Any) -> Optional[Tuple[float, float]]:
+    """Extract (from, to) course values from an entry's text if present.
+
+    Non-dict entries yield None. Texts starting with ``"Course change:"`` are
+    scanned by hand; anything the fast path cannot read cleanly falls back to
+    the regular expression.
+    """
+    if not isinstance(entry, dict):
+        return None
     text = entry.get("text")
-    if not isinstance(text, str):
+    prefix = _COURSE_PREFIX
+    if not isinstance(text, str) or prefix not in text:
         return None
-    match = re.search(
-        r"Course change:\s*([0-9]+(?:\.[0-9]+)?)\s*[°º]?\s*(?:→|->)\s*([0-9]+(?:\.[0-9]+)?)",
-        text,
-    )
+    if text.startswith(prefix):
+        rest = text[len(prefix):]
+        arrow = rest.find("→")
+        width = 1
+        if arrow < 0:
+            arrow = rest.find("->")
+            width = 2
+        if arrow >= 0:
+            left = rest[:arrow].strip()
+            if left.endswith(("°", "º")):
+                left = left[:-1].rstrip()
+            right = rest[arrow + width:].lstrip()
+            end = _scan_number(right, 0)
+            if left and end and _scan_number(left, 0) == len(left):
+                return float(left), float(right[:end])
+    match = _COURSE_RE.search(text)
     if not match:
         return None
     return float(match.group(1)), float(match.group(2))
@@ -65,6 +203,114 @@ def get_speed_knots(entry: Dict[str, Any]) -> Optional[float]:
         return float(spd)
     return None
 
+def _is_slow_course_change(entry: Dict[str, Any]) -> bool:
+    """Return True when a course change entry was logged below 0.6 kt."""
+    spd = get_speed_knots(entry)
+    return spd is not None and spd < 0.6
+
+def _course_change_runs(from_courses: List[Optional[float]]) -> Iterator[Tuple[int, int]]:
+    """Yield ``[start, end)`` index ranges of successive entries to merge.
+
+    Args:
+        from_courses: Starting course per entry, or None for non-course-change entries.
+
+    Yields:
+        Tuple[int, int]: Ranges covering every entry in order; entries that are not
+        course changes form single-entry runs.
+    """
+    # groupby finds the runs in C; unique sentinels keep non-course-change entries apart.
+    # Keys stay numeric rather than raw text so "10°" and "10.0°" still merge.
+    keys = [object() if key is None else key for key in from_courses]
+    start = 0
+    for _, run in groupby(keys):
+        end = start + len(list(run))
+        yield start, end
+        start = end
+
+
+def _combine_group(group: List[Dict[str, Any]], from_course: float, final_to: float) -> Dict[str, Any]:
+    """Combine a run of course change entries into a single entry.
+
+    Args:
+        group: Successive course change entries sharing the same starting course.
+        from_course: Shared starting course in degrees.
+        final_to: Destination course of the last entry in degrees.
+
+    Returns:
+        Dict[str, Any]: Entry with the last position/speed, maximum speed/wind values,
+        and averaged wind speed and direction.
+    """
+    combined = group[0].copy()
+    combined["text"] = f"Course change: {from_course:g}° → {final_to:g}°"
+
+    if "position" in group[-1]:
+        combined["position"] = group[-1]["position"]
+    if "speed" in group[-1]:
+        combined["speed"] = group[-1]["speed"]
+    # Determine maximum speed/wind and wind averages in one pass over the group
+    max_speed = None
+    max_wind = None
+    wind_speed_sum = 0.0
+    wind_speed_count = 0
+    wind_dirs: List[float] = []
+    for e in group:
+        value = e.get("maxSpeed")
+        if value is not None and (max_speed is None or value > max_speed):
+            max_speed = value
+        value = e.get("maxWind")
+        if value is not None and (max_wind is None or value > max_wind):
+            max_wind = value
+        wind = e.get("wind")
+        if isinstance(wind, dict):
+            value = wind.get("speed")
+            if value is not None:
+                wind_speed_sum += value
+                wind_speed_count += 1
+            value = wind.get("direction")
+            if value is not None:
+                wind_dirs.append(value)
+    if max_speed is not None:
+        combined["maxSpeed"] = max_speed
+    if max_wind is not None:
+        combined["maxWind"] = max_wind
+    # Average wind speed and direction
+    if wind_speed_count or wind_dirs:
+        # Fresh dict: group[0]'s wind may be shared with a YAML alias elsewhere
+        wind = combined.get("wind")
+        combined["wind"] = dict(wind) if isinstance(wind, dict) else {}
+        if wind_speed_count:
+            combined["wind"]["speed"] = wind_speed_sum / wind_speed_count
+        if wind_dirs:
+            combined["wind"]["direction"] = circular_mean(wind_dirs)
+    return combined
+
+
+def iter_merged_entries(entries: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Yield entries with successive same-origin course changes merged.
+
+    Args:
+        entries: Sequence of log entries parsed from YAML.
+
+    Yields:
+        Dict[str, Any]: Normalised entries, skipping low-speed course changes.
+    """
+    # Parse every entry once (map keeps the loop in C) into a column of starting courses
+    parsed_all = list(map(parse_course_change, entries))
+    from_courses = [p[0] if p else None for p in parsed_all]
+    for start, end in _course_change_runs(from_courses):
+        entry = entries[start]
+        from_course = from_courses[start]
+        if from_course is None:
+            yield entry
+            continue
+        if end - start == 1:
+            combined = entry
+        else:
+            combined = _combine_group(entries[start:end], from_course, parsed_all[end - 1][1])  # type: ignore[index]
+        if not _is_slow_course_change(combined):
+            yield combined
+
+
 def merge_entries(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """Merge successive course change entries that share the same starting course.
 
@@ -74,81 +320,71 @@ def merge_entries(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     Returns:
         List[Dict[str, Any]]: Normalised entries with merged course changes.
     """
-    merged: List[Dict[str, Any]] = []
-    i = 0
-    n = len(entries)
-    while i < n:
-        entry = entries[i]
-
-        parsed = parse_course_change(entry) if isinstance(entry, dict) else None
-        if parsed:
-            from_course, _ = parsed
-            group = [entry]
-            i += 1
-            while i < n:
-                next_entry = entries[i]
-                next_parsed = parse_course_change(next_entry) if isinstance(next_entry, dict) else None
-                if next_parsed and next_parsed[0] == from_course:
-                    group.append(next_entry)
-                    i += 1
-                else:
-                    break
-
-            if len(group) == 1:
-                merged.append(entry)
-                continue
-            combined = group[0].copy()
-
-            _, final_to = parse_course_change(group[-1])  # type: ignore[arg-type]
-            combined["text"] = f"Course change: {from_course:g}° → {final_to:g}°"
-
-            if "position" in group[-1]:
-                combined["position"] = group[-1]["position"]
-            if "speed" in group[-1]:
-                combined["speed"] = group[-1]["speed"]
-            # Determine maximum speed and wind values
-            max_speed = max(
-                (e.get("maxSpeed") for e in group if e.get("maxSpeed") is not None),
-                default=None,
-            )
-            if max_speed is not None:
-                combined["maxSpeed"] = max_speed
-            max_wind = max(
-                (e.get("maxWind") for e in group if e.get("maxWind") is not None),
-                default=None,
-            )
-            if max_wind is not None:
-                combined["maxWind"] = max_wind
-            # Average wind speed and direction
-            wind_speeds = [
-                e.get("wind", {}).get("speed")
-                for e in group
-                if e.get("wind", {}).get("speed") is not None
-            ]
-            wind_dirs = [
-                e.get("wind", {}).get("direction")
-                for e in group
-                if e.get("wind", {}).get("direction") is not None
-            ]
-            if wind_speeds or wind_dirs:
-                combined.setdefault("wind", {})
-                if wind_speeds:
-                    combined["wind"]["speed"] = sum(wind_speeds) / len(wind_speeds)
-                if wind_dirs:
-                    combined["wind"]["direction"] = circular_mean(wind_dirs)
-            merged.append(combined)
+    return list(iter_merged_entries(entries))
+
+
+def dump_entries(entries: Iterable[Any], stream: TextIO) -> None:
+    """Write entries to a stream as a YAML block sequence, one item at a time.
+
+    Emitting each item separately avoids holding the whole output document
+    in the emitter; the text matches dumping the full list in one call.
+
+    Args:
+        entries: Entries to serialise, typically from ``iter_merged_entries``.
+        stream: Writable text stream receiving the YAML output.
+    """
+    empty = True
+    for entry in entries:
+        yaml.dump([entry], stream, Dumper=_Dumper, sort_keys=False)
+        empty = False
+    if empty:
+        yaml.dump([], stream, Dumper=_Dumper, sort_keys=False)
+
+
+def _file_digest(path: str) -> bytes:
+    """Return the BLAKE2b digest of a file's contents."""
+    with open(path, "rb") as f:
+        return hashlib.blake2b(f.read()).digest()
+
+
+def write_entries_atomic(entries: Iterable[Any], path: str, skip_unchanged: bool = False) -> bool:
+    """Stream entries to a temporary file beside ``path`` and move it into place on success.
+
+    If serialising (or the merge feeding ``entries``) fails, the temporary file
+    is removed and any existing file at ``path`` is left intact.
+
+    Args:
+        entries: Entries to serialise, typically from ``iter_merged_entries``.
+        path: Destination YAML file path.
+        skip_unchanged: Leave ``path`` untouched (keeping its mtime) when the
+            output is byte-for-byte identical to it.
+
+    Returns:
+        bool: True when ``path`` was replaced, False when it was left unchanged.
+    """
+    dir_name = os.path.dirname(path) or "."
+    tmp_path = None
+    try:
+        with tempfile.NamedTemporaryFile("w", delete=False, dir=dir_name, encoding="utf-8", suffix=".tmp") as tmp:
+            tmp_path = tmp.name
+            dump_entries(entries, tmp)
+        exists = os.path.exists(path)
+        if skip_unchanged and exists and _file_digest(tmp_path) == _file_digest(path):
+            os.unlink(tmp_path)
+            return False
+        # NamedTemporaryFile creates 0600 files; give the result the usual file mode
+        if exists:
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
         else:
-            merged.append(entry)
-            i += 1
-    # After merging, drop course change entries with speed < 0.6 kt
-    filtered: List[Dict[str, Any]] = []
-    for e in merged:
-        is_course_change = parse_course_change(e) is not None if isinstance(e, dict) else False
-        spd = get_speed_knots(e) if isinstance(e, dict) else None
-        if is_course_change and spd is not None and spd < 0.6:
-            continue  # skip low-speed course change entries
-        filtered.append(e)
-    return filtered
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp_path, 0o666 & ~umask)
+        os.replace(tmp_path, path)
+        return True
+    except BaseException:
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
 
 
 def _is_good_position_value(pos: Any) -> bool:
@@ -179,11 +415,7 @@ def _is_maxima_entry(entry: Dict[str, Any]) -> bool:
     text = entry.get("text")
     if not isinstance(text, str) or not text:
         return False
-    pattern = re.compile(
-        r"\b(?:new\s+(?:wind\s+speed|speed|heel)\s+record|max(?:imum)?\s+(?:wind\s+speed|wind|speed|heel))\b",
-        re.IGNORECASE,
-    )
-    return pattern.search(text) is not None
+    return _MAX_RE.search(text) is not None
 
 
 def fix_maxima_positions(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -227,16 +459,13 @@ def main() -> None:
     in_path = args.input
     out_path = args.output
     with open(in_path, "r", encoding="utf-8") as f:
-
-        data = yaml.safe_load(f)
+        data = yaml.load(f.read(), Loader=_Loader)
     if not isinstance(data, list):
         print("Log must contain a list of entries", file=sys.stderr)
         sys.exit(1)
     if args.fix_maxima_pos:
         data = fix_maxima_positions(data)
-    result = merge_entries(data)
-    with open(out_path, "w", encoding="utf-8") as f:
-        yaml.safe_dump(result, f, sort_keys=False)
+    write_entries_atomic(iter_merged_entries(data), out_path)
 
 
 if __name__ == "__main__":
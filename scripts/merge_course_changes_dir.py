@@ -2,62 +2,256 @@
 """Batch-run course change merging over YAML files in a directory.
 
 Usage:
-  python merge_course_changes_dir.py <directory> [--inplace] [--out-dir DIR] [--fix-maxima-pos]
+  python merge_course_changes_dir.py <directory> [--inplace] [--out-dir DIR] [--fix-maxima-pos] [--cache] [--jobs N]
 
 Behavior:
 - Without --inplace, writes results to <directory>/merged/<filename> (or --out-dir).
 - With --inplace, overwrites each source file atomically.
 - Processes non-recursively only files matching *.yml in the specified directory.
+- Files are processed in parallel worker processes (--jobs, default: CPU count).
+- Files without any "Course change:" text (and, with --fix-maxima-pos, without
+  maxima/record text) are only checked to be a valid YAML list, then copied
+  unchanged, or left untouched with --inplace.
+- With --cache (requires msgpack), parsed entries are cached in <directory>/.cache/<filename>.mp
+  and reused while the source file's mtime and size match the cached stamp. Files
+  using YAML anchors are never cached. This writes into the source directory even
+  when --out-dir is used.
 """
 from __future__ import annotations
 
 import argparse
+import mmap
 import os
+import re
 import sys
 import glob
 import tempfile
 import shutil
-from typing import List
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Set, Tuple
 
 import yaml
 
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:  # pragma: no cover - depends on how PyYAML was built
+    from yaml import SafeLoader as _Loader
+
+try:
+    # Optional: binary side-car cache of parsed YAML for repeat runs
+    import msgpack
+except ImportError:  # pragma: no cover - caching is skipped without msgpack
+    msgpack = None
+
 try:
     # Reuse the core merging logic from the existing script
-    from merge_course_changes import merge_entries, fix_maxima_positions
+    from merge_course_changes import iter_merged_entries, fix_maxima_positions, write_entries_atomic
 except Exception as e:  # pragma: no cover - helpful error for CLI usage
     print(f"Error importing merge_course_changes: {e}", file=sys.stderr)
     sys.exit(1)
 
 
-def process_file(src_path: str, dst_path: str, fix_maxima_pos: bool = False) -> None:
-    """Process a single YAML file, writing the merged output to a destination path."""
+_COURSE_CHANGE_MARKER = b"Course change:"
+# Directories already ensured by this process; avoids a makedirs syscall per file
+_created_dirs: Set[str] = set()
+_MAXIMA_MARKER_RE = re.compile(rb"max|record", re.IGNORECASE)
+# A YAML anchor ("&name" after whitespace or a flow indicator); may also match inside
+# quoted text, which only costs a skipped cache write
+_ANCHOR_RE = re.compile(r"(?:^|[\s\[{,])&[^\s\[\]{},]", re.MULTILINE)
+
+
+def _needs_processing(src_path: str, fix_maxima_pos: bool) -> bool:
+    """Return True when a file may contain entries the merge would change.
+
+    The raw bytes are scanned through a read-only memory map so files without
+    course changes (or maxima text when fixing positions) skip YAML parsing.
+
+    Args:
+        src_path: Path to the YAML file.
+        fix_maxima_pos: Whether maxima position backfilling is requested.
+
+    Returns:
+        bool: False only when the file is known to need no changes.
+    """
+    fd = os.open(src_path, os.O_RDONLY)
+    try:
+        if os.fstat(fd).st_size == 0:
+            return True  # let the YAML loader report the empty file
+        with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+            if mm.find(_COURSE_CHANGE_MARKER) != -1:
+                return True
+            return fix_maxima_pos and _MAXIMA_MARKER_RE.search(mm) is not None
+    finally:
+        os.close(fd)
+
+
+def _check_entries(src_path: str) -> None:
+    """Check that a file skipped by the marker scan still holds a valid list of entries.
+
+    Only parser events are produced (no Python objects are built), so this
+    costs a fraction of a full load. Documents the event scan cannot fully
+    vouch for (explicit tags, aliases, several documents) are loaded instead.
+
+    Args:
+        src_path: Path to the YAML file.
+
+    Raises:
+        yaml.YAMLError: If the file is not valid YAML.
+        ValueError: If the YAML root is not a list.
+    """
+    with open(src_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    root = None
+    for event in yaml.parse(text, Loader=_Loader):
+        if isinstance(event, yaml.DocumentStartEvent) and root is not None:
+            _load_entries(src_path)  # let the loader report the extra document
+            return
+        if isinstance(event, yaml.AliasEvent) or getattr(event, "tag", None) is not None:
+            _load_entries(src_path)
+            return
+        if root is None and isinstance(event, yaml.NodeEvent):
+            root = event
+    if not isinstance(root, yaml.SequenceStartEvent):
+        raise ValueError(f"{src_path}: YAML root must be a list of entries")
+
+
+def _cache_path(src_path: str) -> str:
+    """Return the msgpack side-car cache path for a source YAML file."""
+    dir_name = os.path.dirname(src_path) or "."
+    return os.path.join(dir_name, ".cache", os.path.basename(src_path) + ".mp")
+
+
+def _read_cache(src_path: str, src_stat: os.stat_result) -> Optional[list]:
+    """Return cached entries for a source file, or None when missing or stale.
+
+    The cache is only used when the recorded source mtime (in nanoseconds) and
+    size match the current file exactly, so restoring an older copy of a log
+    (``cp -p``, ``rsync -a``) invalidates it.
+    """
+    try:
+        with open(_cache_path(src_path), "rb") as f:
+            payload = msgpack.unpackb(f.read(), raw=False, strict_map_key=False)
+    except (OSError, ValueError, msgpack.UnpackException):
+        return None
+    if (
+        not isinstance(payload, dict)
+        or payload.get("mtime_ns") != src_stat.st_mtime_ns
+        or payload.get("size") != src_stat.st_size
+    ):
+        return None
+    data = payload.get("entries")
+    return data if isinstance(data, list) else None
+
+
+def _write_cache(src_path: str, src_stat: os.stat_result, data: list) -> None:
+    """Atomically write parsed entries to the side-car cache, ignoring failures.
+
+    Entries holding values msgpack cannot represent (e.g. YAML timestamps) are
+    not cached. A failed write leaves no temporary file behind.
+    """
+    cache = _cache_path(src_path)
+    tmp_path = None
+    try:
+        payload = msgpack.packb({"mtime_ns": src_stat.st_mtime_ns, "size": src_stat.st_size, "entries": data})
+        os.makedirs(os.path.dirname(cache), exist_ok=True)
+        with tempfile.NamedTemporaryFile("wb", delete=False, dir=os.path.dirname(cache), suffix=".tmp") as tmp:
+            tmp_path = tmp.name
+            tmp.write(payload)
+        os.replace(tmp_path, cache)
+    except (OSError, TypeError, ValueError, OverflowError):
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def _load_entries(src_path: str, use_cache: bool = False) -> list:
+    """Load the list of log entries from a YAML file, using the side-car cache if requested.
+
+    Args:
+        src_path: Path to the source YAML file.
+        use_cache: Read and refresh the msgpack cache when msgpack is installed.
+
+    Returns:
+        list: Parsed log entries.
+    """
+    use_cache = use_cache and msgpack is not None
+    if use_cache:
+        # Stat before reading so a concurrent rewrite can never match the cached stamp
+        src_stat = os.stat(src_path)
+        data = _read_cache(src_path, src_stat)
+        if data is not None:
+            return data
     with open(src_path, "r", encoding="utf-8") as f:
-        data = yaml.safe_load(f)
+        text = f.read()
+    data = yaml.load(text, Loader=_Loader)
     if not isinstance(data, list):
         raise ValueError(f"{src_path}: YAML root must be a list of entries")
+    # msgpack expands aliases into separate objects, so documents with anchors
+    # would not round-trip; always parse those from YAML
+    if use_cache and _ANCHOR_RE.search(text) is None:
+        _write_cache(src_path, src_stat, data)
+    return data
+
+
+def _ensure_dir(path: str) -> None:
+    """Create a directory once per process; later calls for the same path are free."""
+    if path not in _created_dirs:
+        os.makedirs(path, exist_ok=True)
+        _created_dirs.add(path)
+
+
+def process_file(src_path: str, dst_path: str, fix_maxima_pos: bool = False, use_cache: bool = False) -> None:
+    """Process a single YAML file, writing the merged output to a destination path."""
+    _ensure_dir(os.path.dirname(dst_path) or ".")
+    if not _needs_processing(src_path, fix_maxima_pos):
+        _check_entries(src_path)
+        if not (os.path.exists(dst_path) and os.path.samefile(src_path, dst_path)):
+            shutil.copyfile(src_path, dst_path)
+        return
+    data = _load_entries(src_path, use_cache=use_cache)
     if fix_maxima_pos:
         data = fix_maxima_positions(data)
-    result = merge_entries(data)
-    os.makedirs(os.path.dirname(dst_path), exist_ok=True)
-    with open(dst_path, "w", encoding="utf-8") as f:
-        yaml.safe_dump(result, f, sort_keys=False)
+    write_entries_atomic(iter_merged_entries(data), dst_path)
 
 
-def process_inplace(src_path: str, fix_maxima_pos: bool = False) -> None:
-    """Merge a YAML file in place using an atomic temporary file replacement."""
-    dir_name = os.path.dirname(src_path) or "."
-    with tempfile.NamedTemporaryFile("w", delete=False, dir=dir_name, encoding="utf-8", suffix=".tmp") as tmp:
-        tmp_path = tmp.name
-        with open(src_path, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f)
-        if not isinstance(data, list):
-            raise ValueError(f"{src_path}: YAML root must be a list of entries")
-        if fix_maxima_pos:
-            data = fix_maxima_positions(data)
-        result = merge_entries(data)
-        yaml.safe_dump(result, tmp, sort_keys=False)
-    # Atomic replace
-    os.replace(tmp_path, src_path)
+def process_inplace(src_path: str, fix_maxima_pos: bool = False, use_cache: bool = False) -> None:
+    """Merge a YAML file in place using an atomic temporary file replacement.
+
+    The source is left untouched (keeping its mtime) when the merged output is
+    byte-for-byte identical to it.
+    """
+    if not _needs_processing(src_path, fix_maxima_pos):
+        _check_entries(src_path)
+        return
+    data = _load_entries(src_path, use_cache=use_cache)
+    if fix_maxima_pos:
+        data = fix_maxima_positions(data)
+    write_entries_atomic(iter_merged_entries(data), src_path, skip_unchanged=True)
+
+
+def _process_one(
+    src: str, out_dir: Optional[str], inplace: bool, fix_maxima_pos: bool, use_cache: bool
+) -> Tuple[str, bool, str]:
+    """Process one file in a worker process, reporting failures instead of raising.
+
+    Args:
+        src: Source YAML file path.
+        out_dir: Output directory when not processing in place.
+        inplace: Overwrite the source file atomically when True.
+        fix_maxima_pos: Backfill maxima positions before merging.
+        use_cache: Use the msgpack side-car cache for parsed YAML.
+
+    Returns:
+        Tuple[str, bool, str]: Source path, success flag, and error message (empty on success).
+    """
+    try:
+        if inplace:
+            process_inplace(src, fix_maxima_pos=fix_maxima_pos, use_cache=use_cache)
+        else:
+            dst = os.path.join(out_dir, os.path.basename(src))  # type: ignore[arg-type]
+            process_file(src, dst, fix_maxima_pos=fix_maxima_pos, use_cache=use_cache)
+    except Exception as e:
+        return src, False, str(e)
+    return src, True, ""
 
 
 def main(argv: List[str] | None = None) -> int:
@@ -71,6 +265,12 @@ def main(argv: List[str] | None = None) -> int:
         action="store_true",
         help="Backfill position for max wind/heel/speed entries using last good position",
     )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Cache parsed YAML as msgpack in <directory>/.cache/ for faster repeat runs (requires msgpack)",
+    )
+    parser.add_argument("--jobs", type=int, default=None, help="Number of worker processes (default: CPU count)")
     args = parser.parse_args(argv)
 
     base_dir = os.path.abspath(args.directory)
@@ -87,21 +287,29 @@ def main(argv: List[str] | None = None) -> int:
     out_dir = None
     if not args.inplace:
         out_dir = os.path.abspath(args.out_dir or os.path.join(base_dir, "merged"))
-        os.makedirs(out_dir, exist_ok=True)
+        _ensure_dir(out_dir)
 
+    workers = max(1, min(args.jobs or os.cpu_count() or 1, len(files)))
+    chunksize = max(1, len(files) // (4 * workers))
+    n = len(files)
     processed = 0
     failed = 0
-    for src in files:
-        try:
-            if args.inplace:
-                process_inplace(src, fix_maxima_pos=args.fix_maxima_pos)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(
+            _process_one,
+            files,
+            [out_dir] * n,
+            [args.inplace] * n,
+            [args.fix_maxima_pos] * n,
+            [args.cache] * n,
+            chunksize=chunksize,
+        )
+        for src, ok, err in results:
+            if ok:
+                processed += 1
             else:
-                dst = os.path.join(out_dir, os.path.basename(src))  # type: ignore[arg-type]
-                process_file(src, dst, fix_maxima_pos=args.fix_maxima_pos)
-            processed += 1
-        except Exception as e:
-            failed += 1
-            print(f"Failed: {src}: {e}", file=sys.stderr)
+                failed += 1
+                print(f"Failed: {src}: {err}", file=sys.stderr)
 
     print(f"Processed: {processed}; Failed: {failed}")
     return 0 if failed == 0 else 2